@@ -1,3 +1,7 @@
+import os
+import queue
+import sys
+import threading
 import serial
 import time
 from datetime import datetime
@@ -6,6 +10,8 @@ from datetime import datetime
 PORT = 'COM10'  # Change to your Arduino's port
 BAUD = 115200
 FILENAME = f"test_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+WRITE_BATCH = 64  # Maximum number of queued chunks written to disk per write call
+ECHO_EVERY = 50   # Echo every Nth sample to the console (1 = echo every sample)
 
 # Open serial connection
 ser = serial.Serial(PORT, BAUD, timeout=1)
@@ -14,16 +20,83 @@ time.sleep(2)  # Allow connection to establish
 print(f"Starting data capture to {FILENAME}")
 print("Press Ctrl+C to stop")
 
+def write_lines(lines, fd, errors):
+    """
+    Drain captured data from the queue and append it to the open file fd.
+    Runs on a background thread so disk stalls never hold up serial reads.
+    A None entry marks the end of the capture. If a write fails, the
+    exception is added to errors and the thread exits.
+    """
+    try:
+        done = False
+        while not done:
+            # Block for the next chunk, then grab whatever else is already queued
+            batch = [lines.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(lines.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                batch.pop()
+                done = True
+            
+            data = b''.join(batch)
+            while data:
+                data = data[os.write(fd, data):]
+    except Exception as e:
+        errors.append(e)
+    finally:
+        os.close(fd)
+
+# Open the output file up front so a bad path fails before capture starts
+fd = os.open(FILENAME, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+
+# Hand data off to the writer thread so the read loop never waits on the disk
+lines = queue.SimpleQueue()
+write_errors = []
+writer = threading.Thread(target=write_lines, args=(lines, fd, write_errors), daemon=True)
+writer.start()
+
+buf = bytearray()
 try:
-    with open(FILENAME, 'w') as file:
-        while True:
-            if ser.in_waiting:
-                line = ser.readline().decode('utf-8').strip()
-                print(line)  # Echo to console
-                file.write(line + '\n')
-                file.flush()  # Make sure data is written immediately
+    samples = 0
+    while True:
+        # Stop capturing if the writer has died rather than queueing data nobody will write
+        if not writer.is_alive():
+            raise write_errors[0]
+        
+        # Read everything pyserial has buffered in one call (blocking for at
+        # least one byte), rather than line by line
+        buf.extend(ser.read(ser.in_waiting or 1))
+        end = buf.rfind(b'\n') + 1
+        if not end:
+            continue
+        
+        # Pass complete lines straight through; only decode the lines we echo
+        chunk = bytes(buf[:end])
+        del buf[:end]
+        lines.put(chunk)
+        count = chunk.count(b'\n')
+        start = line = 0
+        for echo in range(-samples % ECHO_EVERY, count, ECHO_EVERY):
+            # Skip ahead to the echoed line without splitting out the others
+            while line < echo:
+                start = chunk.index(b'\n', start) + 1
+                line += 1
+            stop = chunk.index(b'\n', start) + 1
+            sys.stdout.write(chunk[start:stop].decode('utf-8', errors='replace'))
+            start, line = stop, line + 1
+        samples += count
 except KeyboardInterrupt:
     print("\nCapture stopped")
 finally:
+    if buf:
+        lines.put(bytes(buf))  # Keep a trailing partial line
+    lines.put(None)
+    writer.join()  # Wait for everything still queued to reach the file
     ser.close()
-    print(f"Data saved to {FILENAME}")
+    if write_errors:
+        print(f"Error writing to {FILENAME}: {write_errors[0]}")
+    else:
+        print(f"Data saved to {FILENAME}")
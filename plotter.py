@@ -1,27 +1,28 @@
-import csv
 import os
 import sys
+import matplotlib
+# With --no-show the plot is only saved, so skip loading a GUI backend
+if '--no-show' in sys.argv:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 from matplotlib.ticker import AutoMinorLocator
 
-def plot_combined_data(input_file):
+# Status strings the firmware logs in place of a sensor reading
+SENSOR_STATUS_VALUES = frozenset(("No Data", "Disabled", "Open Circuit", "Short Circuit"))
+
+def plot_combined_data(input_file, show=True):
     """
-    Create a combined plot with multiple y-axes:
-    - Primary Y-axis: Pitch (degrees)
-    - Secondary Y-axes: Fuel Level and Temperatures
+    Create a combined plot of three stacked axes sharing one time axis:
+    - Top: Pitch (degrees) with phase markers
+    - Middle: Fuel Level
+    - Bottom: Internal and External Temperatures
     - X-axis: Time (seconds)
     
     This shows how pitch changes affect fuel level and temperatures.
+    The figure is displayed after saving unless show is False.
     """
-    # Initialize lists to store data
-    times = []
-    pitches = []
-    fuel_levels = []
-    internal_temps = []
-    external_temps = []
-    phases = []
-    
     # Phase markers for the plot
     phase_markers = {
         'Movement': {'marker': 'o', 'color': 'blue'},
@@ -32,143 +33,105 @@ def plot_combined_data(input_file):
     }
     
     try:
-        with open(input_file, 'r', newline='') as infile:
-            reader = csv.reader(infile)
-            
-            # Process header row
-            header = next(reader)
-            
-            # Find the column indices
-            time_index = header.index('TimeMS') if 'TimeMS' in header else 0
-            fuel_level_index = header.index('FuelLevel') if 'FuelLevel' in header else 1
-            internal_temp_index = header.index('InternalTemp') if 'InternalTemp' in header else 2
-            external_temp_index = header.index('ExternalTemp') if 'ExternalTemp' in header else 3
-            pitch_index = header.index('Pitch') if 'Pitch' in header else 4
-            phase_index = header.index('Phase') if 'Phase' in header else 5
-            
-            # Process data rows
-            for row in reader:
-                if len(row) > max(time_index, pitch_index, phase_index, fuel_level_index, internal_temp_index, external_temp_index):
-                    # Convert time from milliseconds to seconds
-                    try:
-                        time_ms = float(row[time_index])
-                        time_sec = time_ms / 1000.0
-                        times.append(time_sec)
-                    except ValueError:
-                        continue
-                    
-                    # Get pitch value
-                    try:
-                        pitch = float(row[pitch_index])
-                        pitches.append(pitch)
-                    except ValueError:
-                        pitches.append(np.nan)
-                    
-                    # Get fuel level
-                    try:
-                        if row[fuel_level_index] != "No Data":
-                            fuel_level = float(row[fuel_level_index])
-                            fuel_levels.append(fuel_level)
-                        else:
-                            fuel_levels.append(np.nan)
-                    except ValueError:
-                        fuel_levels.append(np.nan)
-                    
-                    # Get internal temperature
-                    try:
-                        if row[internal_temp_index] != "No Data":
-                            internal_temp = float(row[internal_temp_index])
-                            internal_temps.append(internal_temp)
-                        else:
-                            internal_temps.append(np.nan)
-                    except ValueError:
-                        internal_temps.append(np.nan)
-                    
-                    # Get external temperature
-                    try:
-                        if row[external_temp_index] != "No Data" and row[external_temp_index] != "Disabled" and \
-                           row[external_temp_index] != "Open Circuit" and row[external_temp_index] != "Short Circuit":
-                            external_temp = float(row[external_temp_index])
-                            external_temps.append(external_temp)
-                        else:
-                            external_temps.append(np.nan)
-                    except ValueError:
-                        external_temps.append(np.nan)
-                    
-                    # Get phase
-                    phase = row[phase_index] if phase_index < len(row) else "Unknown"
-                    phases.append(phase)
-        
-        # Create figure and primary axis for pitch
-        fig, ax1 = plt.subplots(figsize=(14, 8))
-        
-        # Plot pitch on primary y-axis
+        # Find the column indices, falling back to the standard column order
+        # for any name missing from the header
+        numeric_columns = ['TimeMS', 'FuelLevel', 'InternalTemp', 'ExternalTemp', 'Pitch']
+        header = list(pd.read_csv(input_file, nrows=0, dtype=str).columns)
+        positions = {name: header.index(name) if name in header else default
+                     for default, name in enumerate(numeric_columns + ['Phase'])}
+        
+        # Parse the plotted columns in one pass; sensor status strings become NaN
+        df = pd.read_csv(input_file,
+                         header=0,
+                         names=range(max(len(header), max(positions.values()) + 1)),
+                         usecols=sorted(set(positions.values())),
+                         na_values=SENSOR_STATUS_VALUES,
+                         dtype=str,
+                         on_bad_lines='warn',
+                         engine='c')
+        df = pd.DataFrame({name: df[index] for name, index in positions.items()})
+        
+        # Any other cell that isn't a number (garbled serial data, a repeated
+        # header line) becomes NaN rather than failing the whole plot
+        for col in numeric_columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        
+        # Skip rows without a valid timestamp
+        df = df.dropna(subset=['TimeMS'])
+        df = df.astype({'FuelLevel': 'float32', 'InternalTemp': 'float32',
+                        'ExternalTemp': 'float32', 'Pitch': 'float32'})
+        
+        # Convert time from milliseconds to seconds
+        times = df['TimeMS'].to_numpy(dtype=np.float64) * 1e-3
+        pitches = df['Pitch'].to_numpy()
+        fuel_levels = df['FuelLevel'].to_numpy()
+        internal_temps = df['InternalTemp'].to_numpy()
+        external_temps = df['ExternalTemp'].to_numpy()
+        phases = df['Phase'].astype(object).fillna("Unknown").to_numpy()
+        
+        # Long captures have far more samples than the plot has pixels, so thin
+        # the line series to ~20k points; markers still use the full data
+        step = max(1, len(times) // 20_000) if len(times) > 50_000 else 1
+        
+        # Stack pitch, fuel level and temperatures on separate axes sharing the time axis
+        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, sharex=True, figsize=(14, 10))
+        legend_style = dict(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize=10,
+                            frameon=True, facecolor='white', edgecolor='black')
+        
+        # Plot pitch on the top axis
         color = 'tab:blue'
-        ax1.set_xlabel('Time (seconds)', fontsize=12)
         ax1.set_ylabel('Pitch (degrees)', color=color, fontsize=12)
-        ax1.plot(times, pitches, color=color, linewidth=2, label='Pitch')
+        ax1.plot(times[::step], pitches[::step], color=color, linewidth=2, label='Pitch')
         ax1.tick_params(axis='y', labelcolor=color)
-        ax1.grid(True, linestyle='--', alpha=0.7)
-        
-        # Add phase markers
-        unique_phases = []
-        for i in range(len(times)):
-            if i % 100 == 0:  # Add marker every 100 points to avoid overcrowding
-                phase = phases[i]
-                if phase not in unique_phases:
-                    unique_phases.append(phase)
-                    marker_config = phase_markers.get(phase, {'marker': 'o', 'color': 'black'})
-                    ax1.scatter(times[i], pitches[i], 
-                               color=marker_config['color'], 
-                               marker=marker_config['marker'], 
-                               s=100, label=phase)
-        
-        # Create secondary y-axis for fuel level
-        ax2 = ax1.twinx()
+        
+        # Add a phase marker wherever the test phase changes, one scatter per phase
+        change_idx = np.flatnonzero(np.concatenate(([len(phases) > 0], phases[1:] != phases[:-1])))
+        change_phases = phases[change_idx]
+        for phase in dict.fromkeys(change_phases):
+            idx = change_idx[change_phases == phase]
+            marker_config = phase_markers.get(phase, {'marker': 'o', 'color': 'black'})
+            ax1.scatter(times[idx], pitches[idx], 
+                       color=marker_config['color'], 
+                       marker=marker_config['marker'], 
+                       s=100, label=phase)
+        
+        # Plot fuel level on the middle axis
         color = 'tab:red'
         ax2.set_ylabel('Fuel Level', color=color, fontsize=12)
-        ax2.plot(times, fuel_levels, color=color, linestyle='--', linewidth=2, label='Fuel Level')
+        ax2.plot(times[::step], fuel_levels[::step], color=color, linestyle='--', linewidth=2, label='Fuel Level')
         ax2.tick_params(axis='y', labelcolor=color)
         
-        # Create third y-axis for temperatures
-        ax3 = ax1.twinx()
-        # Offset the third axis
-        ax3.spines["right"].set_position(("axes", 1.1))
+        # Plot temperatures on the bottom axis
         color = 'tab:green'
+        ax3.set_xlabel('Time (seconds)', fontsize=12)
         ax3.set_ylabel('Temperature', color=color, fontsize=12)
-        ax3.plot(times, internal_temps, color=color, linestyle='-.', linewidth=2, label='Internal Temp')
-        ax3.plot(times, external_temps, color='tab:purple', linestyle=':', linewidth=2, label='External Temp')
+        ax3.plot(times[::step], internal_temps[::step], color=color, linestyle='-.', linewidth=2, label='Internal Temp')
+        ax3.plot(times[::step], external_temps[::step], color='tab:purple', linestyle=':', linewidth=2, label='External Temp')
         ax3.tick_params(axis='y', labelcolor=color)
         
-        # Add minor grid lines
-        ax1.xaxis.set_minor_locator(AutoMinorLocator())
-        ax1.yaxis.set_minor_locator(AutoMinorLocator())
-        ax1.grid(which='minor', linestyle=':', alpha=0.4)
+        # Add grid lines and a legend to each axis
+        for ax in (ax1, ax2, ax3):
+            ax.xaxis.set_minor_locator(AutoMinorLocator())
+            ax.yaxis.set_minor_locator(AutoMinorLocator())
+            ax.grid(True, linestyle='--', alpha=0.7)
+            ax.grid(which='minor', linestyle=':', alpha=0.4)
+            ax.legend(**legend_style)
         
         # Add title
-        plt.title('Pitch, Fuel Level, and Temperature vs Time', fontsize=16, fontweight='bold')
-        
-        # Create combined legend
-        lines1, labels1 = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        lines3, labels3 = ax3.get_legend_handles_labels()
-        
-        ax1.legend(lines1 + lines2 + lines3, labels1 + labels2 + labels3, 
-                   loc='upper center', bbox_to_anchor=(0.5, -0.12), ncol=4, fontsize=10,
-                   frameon=True, facecolor='white', edgecolor='black')
+        fig.suptitle('Pitch, Fuel Level, and Temperature vs Time', fontsize=16, fontweight='bold')
         
         # Create output filename based on input filename
-        base_name = os.path.splitext(input_file)[0]
+        base_name = os.path.splitext(input_file.removesuffix('.gz'))[0]
         output_file = f"{base_name}_combined_plot.png"
         pdf_output = f"{base_name}_combined_plot.pdf"
         
         # Save figure
         plt.tight_layout()
-        plt.subplots_adjust(bottom=0.2)  # Make room for the legend
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.savefig(pdf_output, bbox_inches='tight')
+        fig.savefig(output_file, dpi=300, bbox_inches='tight')
+        fig.savefig(pdf_output, bbox_inches='tight')
         
-        plt.show()
+        if show:
+            plt.show()
         
         print(f"Plots saved to:")
         print(f"  PNG: {output_file}")
@@ -183,8 +146,10 @@ def plot_combined_data(input_file):
 
 def main():
     # Check if file was provided as command line argument
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if arg != '--no-show']
+    show = '--no-show' not in sys.argv
+    if args:
+        input_file = args[0]
     else:
         # Ask user for input file
         input_file = input("Enter path to CSV file: ").strip('"')
@@ -195,7 +160,7 @@ def main():
         return
     
     # Plot the data
-    plot_combined_data(input_file)
+    plot_combined_data(input_file, show=show)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
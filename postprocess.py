@@ -1,61 +1,74 @@
-import csv
+import gzip
+import itertools
 import os
 import sys
 from datetime import datetime
+import pandas as pd
 
-def process_csv_file(input_file):
+try:
+    import pyarrow as pa
+    # Arrow-backed strings run the column string ops below in C++
+    TEXT_DTYPE = pd.ArrowDtype(pa.string())
+except ImportError:  # pyarrow is optional; Python strings give the same output, only slower
+    TEXT_DTYPE = object
+
+def process_csv_file(input_file, compress=False):
     """
     Process the CSV file to reformat fuel level and temperature data.
     Converts:
         - Fuel level
         - Internal temp
         - External temp
+    
+    If compress is True the output is written as gzip (.csv.gz).
     """
     # Create output filename based on input filename
-    base_name = os.path.splitext(input_file)[0]
+    base_name = os.path.splitext(input_file.removesuffix('.gz'))[0]
     output_file = f"{base_name}_processed_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    
-    # Count of rows processed
-    rows_processed = 0
+    if compress:
+        output_file += ".gz"
     
     try:
-        with open(input_file, 'r', newline='') as infile, open(output_file, 'w', newline='') as outfile:
-            reader = csv.reader(infile)
-            writer = csv.writer(outfile)
-            
-            # Process header row
-            header = next(reader)
-            writer.writerow(header)
-            
-            # Process data rows
-            for row in reader:
-                if len(row) >= 5:  # Make sure row has enough columns
-                    # Process fuel level
-                    try:
-                        if row[1] != "No Data" and row[1].isdigit():
-                            fuel_level = int(row[1])
-                            row[1] = f"{fuel_level / 100:.2f}"
-                    except (ValueError, IndexError):
-                        pass
-                    
-                    # Process internal temperature
-                    try:
-                        if row[2] != "No Data" and row[2].isdigit():
-                            internal_temp = int(row[2])
-                            row[2] = f"{internal_temp / 100:.2f}"
-                    except (ValueError, IndexError):
-                        pass
-                    
-                    # Process external temperature
-                    try:
-                        if row[3] != "No Data" and row[3] != "Disabled" and row[3] != "Open Circuit" and row[3] != "Short Circuit" and row[3].isdigit():
-                            external_temp = int(row[3])
-                            row[3] = f"{external_temp / 100:.2f}"
-                    except (ValueError, IndexError):
-                        pass
+        rows_processed = 0
+        opener = gzip.open if input_file.endswith('.gz') else open
+        # Level 1 gzip is nearly free to write and shrinks the digit-heavy logs several times over
+        if compress:
+            outfile = gzip.open(output_file, 'wt', compresslevel=1, newline='')
+        else:
+            outfile = open(output_file, 'w', newline='')
+        with opener(input_file, 'rt', newline='') as infile, outfile:
+            # Stream the log in 200k-line chunks so memory stays flat on long captures
+            for chunk_index in itertools.count():
+                block = list(itertools.islice(infile, 200_000))
+                if not block:
+                    break
+                lines = pd.Series(block, dtype=TEXT_DTYPE).str.rstrip('\r\n')
                 
-                writer.writerow(row)
-                rows_processed += 1
+                # Split off the first four fields; field 4 keeps the rest of the row as-is,
+                # so rows with extra fields pass through and rows with fewer than 5 fields
+                # (e.g. a line cut off mid-write) have no field 4 and are left unscaled
+                fields = lines.str.split(',', n=4, expand=True).reindex(columns=range(5))
+                full_rows = fields[4].notna()
+                if chunk_index == 0:
+                    full_rows.iloc[0] = False  # Header row
+                
+                # Scale raw integer readings by 1/100; status strings such as
+                # "No Data" or "Open Circuit" don't match and are left as-is
+                for col in (1, 2, 3):
+                    # Matched cells are all digits, so dividing by 100 to two decimals is just
+                    # moving the decimal point: "1236" -> "12.36", "5" -> "0.05"
+                    digits = fields[col].str.fullmatch(r'[0-9]+', na=False) & full_rows
+                    padded = fields.loc[digits, col].str.lstrip('0').str.zfill(3)
+                    fields.loc[digits, col] = padded.str[:-2] + '.' + padded.str[-2:]
+                
+                # Reassemble full rows, write short rows back unchanged, and
+                # write the whole chunk in one call
+                rebuilt = fields[0] + ',' + fields[1] + ',' + fields[2] + ',' + fields[3] + ',' + fields[4]
+                lines = lines.where(~full_rows, rebuilt)
+                outfile.write('\r\n'.join(lines.to_numpy()) + '\r\n')
+                rows_processed += len(lines)
+        
+        rows_processed = max(rows_processed - 1, 0)  # Don't count the header
         
         print(f"Processing complete!")
         print(f"Processed {rows_processed} rows")
@@ -68,8 +81,10 @@ def process_csv_file(input_file):
 
 def main():
     # Check if file was provided as command line argument
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
+    args = [arg for arg in sys.argv[1:] if arg != '--gzip']
+    compress = '--gzip' in sys.argv
+    if args:
+        input_file = args[0]
     else:
         # Ask user for input file
         input_file = input("Enter path to CSV file: ").strip('"')
@@ -80,7 +95,7 @@ def main():
         return
     
     # Process the file
-    process_csv_file(input_file)
+    process_csv_file(input_file, compress=compress)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file